@@ -6,3 +6,4 @@ import crackpy.fracture_analysis.pipeline
 import crackpy.fracture_analysis.plot
 import crackpy.fracture_analysis.write
 import crackpy.fracture_analysis.read
+import crackpy.fracture_analysis.sif_formulas
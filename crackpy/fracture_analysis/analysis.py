@@ -1,4 +1,8 @@
+import multiprocessing
+import re
+import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import rich.progress as progress_rich
@@ -9,9 +13,109 @@ from crackpy.fracture_analysis.line_integration import (
     calculate_line_integral,
 )
 from crackpy.fracture_analysis.optimization import Optimization, OptimizationProperties
+from crackpy.fracture_analysis.sif_formulas import chen_to_sifs, cjp_to_sifs, williams_to_sifs
 from crackpy.structure_elements.data_files import Nodemap
 from crackpy.structure_elements.material import Material
 
+# NaN statistics of paths or terms without valid values are expected and stay NaN
+for _message in ("Mean of empty slice", "All-NaN slice encountered"):
+    warnings.filterwarnings("ignore", message=_message, category=RuntimeWarning, module=re.escape(__name__))
+
+# results stored if an optimization fails
+_NAN_CJP_RESULTS = dict.fromkeys(['Error', 'K_F', 'K_R', 'K_S', 'K_II', 'T'], np.nan)
+_NAN_WILLIAMS_RESULTS = dict.fromkeys(['Error', 'K_I', 'K_II', 'T'], np.nan)
+
+
+# data shared by all integration paths calculated in a worker process (set by _init_path_worker)
+_worker_path_data = None
+
+
+def _init_path_worker(data: InputData, material: Material, integral_properties: IntegralProperties) -> None:
+    """Store the data shared by all integration paths once per worker process.
+
+    Args:
+        data: obj of class InputData
+        material: obj of class Material
+        integral_properties: obj of class IntegralProperties
+
+    """
+    global _worker_path_data
+    _worker_path_data = (data, material, integral_properties)
+
+
+def _calculate_path_in_worker(sizes: tuple) -> tuple:
+    """Calculate the line integral of a single integration path in a worker process initialized
+    with :func:`_init_path_worker`. Only the path sizes are sent to the worker.
+
+    Args:
+        sizes: tuple (size_left, size_right, size_bottom, size_top) of the path
+
+    Returns:
+        see :func:`_calculate_path`
+
+    """
+    return _calculate_path(*_worker_path_data, sizes)
+
+
+def _calculate_path(data: InputData, material: Material, integral_properties: IntegralProperties,
+                    sizes: tuple) -> tuple:
+    """Calculate the line integral of a single integration path.
+
+    Args:
+        data: obj of class InputData
+        material: obj of class Material
+        integral_properties: obj of class IntegralProperties
+        sizes: tuple (size_left, size_right, size_bottom, size_top) of the path
+
+    Returns:
+        tuple of path results, Williams coefficients [n, a_n, b_n], integral sizes,
+        integration points, number of path nodes, and tick size
+
+    """
+    line_integral, int_sizes = calculate_line_integral(
+        data,
+        material,
+        integral_properties,
+        *sizes,
+        integral_properties.mask_tolerance,
+        integral_properties.buckner_williams_terms,
+    )
+    path_properties = line_integral.integration_path.path_properties
+    return ([line_integral.j_integral,
+             line_integral.sif_k_j,
+             line_integral.sif_k_i,
+             line_integral.sif_k_ii,
+             line_integral.t_stress_chen,
+             line_integral.t_stress_sdm,
+             line_integral.t_stress_int],
+            line_integral.williams_coefficients,
+            int_sizes,
+            line_integral.np_integration_points,
+            path_properties.number_of_nodes,
+            path_properties.tick_size)
+
+
+# attributes of FractureAnalysis holding the results (copied back from worker processes)
+_RESULT_ATTRIBUTES = ('cjp_coeffs', 'res_cjp', 'williams_coeffs', 'williams_fit_a_n', 'williams_fit_b_n', 'sifs_fit',
+                      'results', 'williams_int', 'sifs_int', 'int_sizes', 'integration_points', 'num_of_path_nodes',
+                      'tick_sizes')
+
+
+def _run_analysis(analysis: 'FractureAnalysis') -> dict:
+    """Run a fracture analysis in a worker process and return its results.
+
+    Only the result attributes are sent back, not the input data, material, or optimization of the analysis.
+
+    Args:
+        analysis: obj of class FractureAnalysis
+
+    Returns:
+        dictionary of the result attributes of the analysis
+
+    """
+    analysis.run()
+    return {name: value for name, value in vars(analysis).items() if name in _RESULT_ATTRIBUTES}
+
 
 class FractureAnalysis:
     """Fracture analysis of a single DIC nodemap.
@@ -26,8 +130,12 @@ class FractureAnalysis:
     - (BETA) T-stress with the Bueckner-Chen integral
     - (BETA) higher-order terms (HOSTs and HORTs) w/ Bueckner-integral
 
+    RuntimeWarnings of NumPy about empty or all-NaN slices raised during the aggregation of path results are
+    suppressed. The corresponding statistics are NaN.
+
     Methods:
         * run - run fracture analysis with the provided data
+        * run_batch - run the fracture analyses of several nodemaps
 
     """
 
@@ -86,24 +194,39 @@ class FractureAnalysis:
         
     
     def _init_integral_results(self):
-        """Initialize lists used for storing integral evaluation results."""
-        self.results = []
-        self.williams_int_a_n = []
-        self.williams_int_b_n = []
-        self.williams_int = []
+        """Initialize arrays and lists used for storing integral evaluation results."""
+        number_of_paths = self.integral_properties.number_of_paths
+        num_of_terms = len(self.integral_properties.buckner_williams_terms)
+        # paths which are not evaluated remain NaN and are ignored by the statistics
+        self.results = np.full((number_of_paths, 7), np.nan)
+        # Williams coefficients [n, a_n, b_n] share one allocation, a_n and b_n are views
+        self.williams_int = np.full((number_of_paths, num_of_terms, 3), np.nan)
         self.sifs_int = None
         self.int_sizes = []
         self.integration_points = []
         self.tick_sizes = []
         self.num_of_path_nodes = []
 
-    def run(self, progress='off', task_id=None):
+    @property
+    def williams_int_a_n(self) -> np.ndarray:
+        """Williams coefficients a_n of the Bueckner-Chen integral for each path (view of *williams_int*)."""
+        # a property instead of a stored view, since views become independent copies when pickled
+        return self.williams_int[:, :, 1]
+
+    @property
+    def williams_int_b_n(self) -> np.ndarray:
+        """Williams coefficients b_n of the Bueckner-Chen integral for each path (view of *williams_int*)."""
+        return self.williams_int[:, :, 2]
+
+    def run(self, progress='off', task_id=None, num_of_kernels: int = 1):
         """Run fracture analysis with the provided data, crack_tip_info, and integral_properties.
         Results are stored as class instance attributes 'results', 'sifs', 'int_sizes', and 'path_nodes'.
 
         Args:
             progress: progress bar object handle (handed-over automatically during pipeline, not needed for single run)
             task_id: task id for progress bar (handed-over automatically during pipeline, not needed for single run)
+            num_of_kernels: number of processes used to calculate the line integrals of the integration paths
+                            (paths are calculated serially for less than 4 paths)
 
         """
         if self.optimization_properties is not None:
@@ -111,7 +234,39 @@ class FractureAnalysis:
             self._run_williams_optimization()
 
         if self.integral_properties is not None:
-            self._run_line_integrals(progress, task_id)
+            self._run_line_integrals(progress, task_id, num_of_kernels)
+
+    @staticmethod
+    def run_batch(analyses: list, num_of_kernels: int = 1) -> list:
+        """Run the fracture analyses of several nodemaps, in parallel if *num_of_kernels* > 1.
+
+        Like FractureAnalysisPipeline.run, one analysis is run per process. The pipeline reads the nodemaps itself
+        and writes the output and plots of every analysis. run_batch instead takes FractureAnalysis objects which
+        are already set up and only calculates their results. The results are stored in the given objects, and
+        their input data, material and optimization objects stay the same.
+
+        Args:
+            analyses: list of FractureAnalysis objects
+            num_of_kernels: number of processes used to run the analyses
+                            (at most half of the number of CPUs as in FractureAnalysisPipeline.run)
+
+        Returns:
+            list of the analysed FractureAnalysis objects
+
+        """
+        analyses = list(analyses)
+
+        # max number of processes is half of the number of CPUs
+        num_of_kernels = min(multiprocessing.cpu_count() // 2, num_of_kernels)
+        if num_of_kernels > 1 and len(analyses) > 1:
+            with ProcessPoolExecutor(max_workers=num_of_kernels) as executor:
+                for analysis, results in zip(analyses, executor.map(_run_analysis, analyses)):
+                    vars(analysis).update(results)
+        else:
+            for analysis in analyses:
+                analysis.run()
+
+        return analyses
 
     def _run_cjp_optimization(self) -> None:
         """Perform CJP optimization and store results."""
@@ -119,25 +274,13 @@ class FractureAnalysis:
             cjp_results = self.optimization.optimize_cjp_displacements()
 
             self.cjp_coeffs = cjp_results.x
-            A_r, B_r, B_i, C, E = self.cjp_coeffs
-
-            # from Christopher et al. (2013) "Extension of the CJP model to mixed mode I and mode II" formulas 4-8
-            K_F = np.sqrt(np.pi / 2) * (A_r - 3 * B_r - 8 * E)
-            K_R = -4 * np.sqrt(np.pi / 2) * (2 * B_i + E * np.pi)
-            K_S = -np.sqrt(np.pi / 2) * (A_r + B_r)
-            K_II = 2 * np.sqrt(2 * np.pi) * B_i
-            T = -C
-            # m to mm
-            K_F /= np.sqrt(1000)
-            K_R /= np.sqrt(1000)
-            K_S /= np.sqrt(1000)
-            K_II /= np.sqrt(1000)
+            K_F, K_R, K_S, K_II, T = cjp_to_sifs(*self.cjp_coeffs.tolist())
 
             self.res_cjp = {'Error': cjp_results.cost, 'K_F': K_F, 'K_R': K_R, 'K_S': K_S, 'K_II': K_II, 'T': T}
 
-        except Exception:
+        except (ValueError, np.linalg.LinAlgError):
             print('CJP optimization failed.')
-            self.res_cjp = {'Error': np.nan, 'K_F': np.nan, 'K_R': np.nan, 'K_S': np.nan, 'K_II': np.nan, 'T': np.nan}
+            self.res_cjp = dict(_NAN_CJP_RESULTS)
 
     def _run_williams_optimization(self) -> None:
         """Perform Williams optimization and store results."""
@@ -146,117 +289,111 @@ class FractureAnalysis:
             self.williams_coeffs = williams_results.x
             a_n = self.williams_coeffs[:len(self.optimization.terms)]
             b_n = self.williams_coeffs[len(self.optimization.terms):]
-            self.williams_fit_a_n = {n: a_n[index] for index, n in enumerate(self.optimization.terms)}
-            self.williams_fit_b_n = {n: b_n[index] for index, n in enumerate(self.optimization.terms)}
+            self.williams_fit_a_n = dict(zip(self.optimization.terms, a_n.tolist()))
+            self.williams_fit_b_n = dict(zip(self.optimization.terms, b_n.tolist()))
 
-            # derive stress intensity factors and T-stress [Kuna formula 3.45]
-            K_I = np.sqrt(2 * np.pi) * self.williams_fit_a_n[1] / np.sqrt(1000)
-            K_II = -np.sqrt(2 * np.pi) * self.williams_fit_b_n[1] / np.sqrt(1000)
-            T = 4 * self.williams_fit_a_n[2]
+            # derive stress intensity factors and T-stress
+            K_I, K_II, T = williams_to_sifs(self.williams_fit_a_n[1], self.williams_fit_b_n[1], self.williams_fit_a_n[2])
 
             self.sifs_fit = {'Error': williams_results.cost, 'K_I': K_I, 'K_II': K_II, 'T': T}
 
-        except Exception:
+        except (ValueError, np.linalg.LinAlgError):
             print('Williams optimization failed.')
-            self.williams_fit_a_n = {n: np.nan for index, n in enumerate(self.optimization.terms)}
-            self.williams_fit_b_n = {n: np.nan for index, n in enumerate(self.optimization.terms)}
-            self.sifs_fit = {'Error': np.nan, 'K_I': np.nan, 'K_II': np.nan, 'T': np.nan}
+            self.williams_fit_a_n = dict.fromkeys(self.optimization.terms, np.nan)
+            self.williams_fit_b_n = dict.fromkeys(self.optimization.terms, np.nan)
+            self.sifs_fit = dict(_NAN_WILLIAMS_RESULTS)
 
-    def _run_line_integrals(self, progress='off', task_id=None) -> None:
+    def _run_line_integrals(self, progress='off', task_id=None, num_of_kernels: int = 1) -> None:
         """Calculate line integrals and aggregate the results."""
+        int_props = self.integral_properties
+        number_of_paths = int_props.number_of_paths
+
+        # path sizes are independent of each other and can be calculated in advance
+        # (accumulated path by path, so the first path keeps the type of the given sizes)
+        current_size_left = int_props.integral_size_left
+        current_size_right = int_props.integral_size_right
+        current_size_bottom = int_props.integral_size_bottom
+        current_size_top = int_props.integral_size_top
+        sizes = []
+        for _ in range(number_of_paths):
+            sizes.append((current_size_left, current_size_right, current_size_bottom, current_size_top))
+            current_size_left -= int_props.paths_distance_left
+            current_size_right += int_props.paths_distance_right
+            current_size_bottom -= int_props.paths_distance_bottom
+            current_size_top += int_props.paths_distance_top
+
         # calculate Williams coefficients with Bueckner-Chen integral method
-        current_size_left = self.integral_properties.integral_size_left
-        current_size_right = self.integral_properties.integral_size_right
-        current_size_top = self.integral_properties.integral_size_top
-        current_size_bottom = self.integral_properties.integral_size_bottom
-
-        if progress is None:
-            iterator = progress_rich.track(range(self.integral_properties.number_of_paths),
-                                           description='Calculating integrals')
+        num_of_kernels = min(multiprocessing.cpu_count(), num_of_kernels)
+        if num_of_kernels > 1 and number_of_paths >= 4:
+            chunksize = max(1, number_of_paths // (4 * num_of_kernels))
+            # data and material are sent once per worker, the tasks only contain the path sizes
+            with ProcessPoolExecutor(max_workers=num_of_kernels, initializer=_init_path_worker,
+                                     initargs=(self.data, self.material, int_props)) as executor:
+                self._collect_path_results(executor.map(_calculate_path_in_worker, sizes, chunksize=chunksize),
+                                           progress, task_id)
         else:
-            iterator = range(self.integral_properties.number_of_paths)
-
-        for n in iterator:
-            # Calculate one integral
-            line_integral, current_int_sizes = calculate_line_integral(
-                self.data,
-                self.material,
-                self.integral_properties,
-                current_size_left,
-                current_size_right,
-                current_size_bottom,
-                current_size_top,
-                self.integral_properties.mask_tolerance,
-                self.integral_properties.buckner_williams_terms,
-            )
-
-            self.results.append([line_integral.j_integral,
-                                 line_integral.sif_k_j,
-                                 line_integral.sif_k_i,
-                                 line_integral.sif_k_ii,
-                                 line_integral.t_stress_chen,
-                                 line_integral.t_stress_sdm,
-                                 line_integral.t_stress_int])
-            self.williams_int_a_n.append(line_integral.williams_a_n)
-            self.williams_int_b_n.append(line_integral.williams_b_n)
-            self.williams_int.append(line_integral.williams_coefficients)
-            self.int_sizes.append(current_int_sizes)
-            self.integration_points.append([list(line_integral.np_integration_points[:, 0]),
-                                            list(line_integral.np_integration_points[:, 1])])
-            self.num_of_path_nodes.append(line_integral.integration_path.path_properties.number_of_nodes)
-            self.tick_sizes.append(line_integral.integration_path.path_properties.tick_size)
-
-            # Update path
-            current_size_left -= self.integral_properties.paths_distance_left
-            current_size_right += self.integral_properties.paths_distance_right
-            current_size_bottom -= self.integral_properties.paths_distance_bottom
-            current_size_top += self.integral_properties.paths_distance_top
+            self._collect_path_results(
+                (_calculate_path(self.data, self.material, int_props, path_sizes) for path_sizes in sizes),
+                progress, task_id)
+
+        self._aggregate_integral_results()
+
+    def _collect_path_results(self, path_results, progress='off', task_id=None) -> None:
+        """Store the results of the single integration paths in order of the paths."""
+        # a live progress bar is only rendered for interactive sessions
+        if progress is None and sys.stderr.isatty():
+            path_results = progress_rich.track(path_results, total=self.integral_properties.number_of_paths,
+                                               description='Calculating integrals')
+        update_progress = progress is not None and progress != "off"
+
+        for n, (results, williams_coefficients, int_sizes, integration_points, num_of_path_nodes, tick_size) \
+                in enumerate(path_results):
+            self.results[n] = results
+            self.williams_int[n] = williams_coefficients
+            self.int_sizes.append(int_sizes)
+            # view of the (x, y) coordinates with shape (2, number of integration points)
+            self.integration_points.append(integration_points[:, :2].T)
+            self.num_of_path_nodes.append(num_of_path_nodes)
+            self.tick_sizes.append(tick_size)
 
             # Update progress bar
-            if progress != "off":
+            if update_progress:
                 progress[task_id] = {"progress": n + 1, "total": self.integral_properties.number_of_paths}
 
-        self._aggregate_integral_results()
-
     def _aggregate_integral_results(self) -> None:
         """Aggregate statistics from the calculated line integrals."""
-        # catch RuntimeWarnings originating from np.nanmean having no valid values
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
-
-            res_array = np.asarray(self.results)
-            self.williams_int = np.asarray(self.williams_int)
-            self.williams_int_a_n = np.asarray(self.williams_int_a_n)
-            self.williams_int_b_n = np.asarray(self.williams_int_b_n)
-
-            # Calculate means
-            mean_j, mean_sif_j, mean_sif_k_i, mean_sif_k_ii, mean_t_stress_chen, mean_t_stress_sdm, mean_t_stress_int = \
-                np.nanmean(res_array, axis=0)
-            mean_williams_int_a_n = np.nanmean(self.williams_int_a_n, axis=0)
-            mean_williams_int_b_n = np.nanmean(self.williams_int_b_n, axis=0)
-
-            # Calculate medians
-            med_j, med_sif_j, med_sif_k_i, med_sif_k_ii, med_t_stress_chen, med_t_stress_sdm, med_t_stress_int = \
-                np.nanmedian(res_array, axis=0)
-            med_williams_int_a_n = np.nanmedian(self.williams_int_a_n, axis=0)
-            med_williams_int_b_n = np.nanmedian(self.williams_int_b_n, axis=0)
-
-            # Calculate means rejecting outliers
-            rej_out_mean_j, rej_out_mean_sif_j, rej_out_mean_sif_k_i, rej_out_mean_sif_k_ii, \
-            rej_out_mean_t_stress_chen, rej_out_mean_t_stress_sdm, rej_out_mean_t_stress_int = \
-                self.mean_wo_outliers(res_array, m=2)
-
-            rej_out_mean_williams_int_a_n = self.mean_wo_outliers(self.williams_int_a_n, m=2)
-            rej_out_mean_williams_int_b_n = self.mean_wo_outliers(self.williams_int_b_n, m=2)
+        res_array = self.results
+
+        # Calculate means, medians, and means rejecting outliers of all path results at once
+        num_of_results = res_array.shape[1]
+        num_of_terms = self.williams_int_a_n.shape[1]
+        means, medians, rej_out_means = (
+            np.split(statistic, [num_of_results, num_of_results + num_of_terms])
+            for statistic in self.column_statistics(
+                np.hstack((res_array, self.williams_int_a_n, self.williams_int_b_n)), m=2)
+        )
+
+        mean_j, mean_sif_j, mean_sif_k_i, mean_sif_k_ii, mean_t_stress_chen, mean_t_stress_sdm, mean_t_stress_int = \
+            means[0]
+        mean_williams_int_a_n, mean_williams_int_b_n = means[1], means[2]
+
+        med_j, med_sif_j, med_sif_k_i, med_sif_k_ii, med_t_stress_chen, med_t_stress_sdm, med_t_stress_int = \
+            medians[0]
+        med_williams_int_a_n, med_williams_int_b_n = medians[1], medians[2]
+
+        rej_out_mean_j, rej_out_mean_sif_j, rej_out_mean_sif_k_i, rej_out_mean_sif_k_ii, \
+        rej_out_mean_t_stress_chen, rej_out_mean_t_stress_sdm, rej_out_mean_t_stress_int = \
+            rej_out_means[0]
+        rej_out_mean_williams_int_a_n, rej_out_mean_williams_int_b_n = rej_out_means[1], rej_out_means[2]
 
         # calculate SIFs with Bueckner-Chen integral method
-        term_index = self.integral_properties.buckner_williams_terms.index(1)
-        mean_k_i_chen = np.sqrt(2 * np.pi) * mean_williams_int_a_n[term_index] / np.sqrt(1000)
-        med_k_i_chen = np.sqrt(2 * np.pi) * med_williams_int_a_n[term_index] / np.sqrt(1000)
-        rej_out_mean_k_i_chen = np.sqrt(2 * np.pi) * rej_out_mean_williams_int_a_n[term_index] / np.sqrt(1000)
-        mean_k_ii_chen = -np.sqrt(2 * np.pi) * mean_williams_int_b_n[term_index] / np.sqrt(1000)
-        med_k_ii_chen = -np.sqrt(2 * np.pi) * med_williams_int_b_n[term_index] / np.sqrt(1000)
-        rej_out_mean_k_ii_chen = -np.sqrt(2 * np.pi) * rej_out_mean_williams_int_b_n[term_index] / np.sqrt(1000)
+        term_index = self.integral_properties.n1_index
+        mean_k_i_chen, mean_k_ii_chen = chen_to_sifs(
+            float(mean_williams_int_a_n[term_index]), float(mean_williams_int_b_n[term_index]))
+        med_k_i_chen, med_k_ii_chen = chen_to_sifs(
+            float(med_williams_int_a_n[term_index]), float(med_williams_int_b_n[term_index]))
+        rej_out_mean_k_i_chen, rej_out_mean_k_ii_chen = chen_to_sifs(
+            float(rej_out_mean_williams_int_a_n[term_index]), float(rej_out_mean_williams_int_b_n[term_index]))
 
         # bundle means / medians / means using outlier rejection
         self.sifs_int = {
@@ -287,12 +424,38 @@ class FractureAnalysis:
         }
 
     @staticmethod
-    def mean_wo_outliers(data: np.ndarray, m=2) -> list:
-        mean_wo_outliers = []
-        for data_i in data.T:
-            d = np.abs(data_i - np.nanmedian(data_i))
-            mdev = np.nanmedian(d)
-            s = d / mdev if mdev else 0
-            mean_wo_outliers.append(np.nanmean(data_i[s < m]))
-        return mean_wo_outliers
+    def column_statistics(data: np.ndarray, m=2) -> tuple:
+        """Column-wise mean, median, and mean rejecting outliers of *data*.
+
+        Args:
+            data: array of shape (number of paths, number of results)
+            m: outlier threshold in multiples of the median absolute deviation (see *mean_wo_outliers*)
+
+        Returns:
+            tuple of arrays (means, medians, means without outliers)
 
+        """
+        median = np.nanmedian(data, axis=0)
+        return np.nanmean(data, axis=0), median, FractureAnalysis.mean_wo_outliers(data, m=m, median=median)
+
+    @staticmethod
+    def mean_wo_outliers(data: np.ndarray, m=2, median: np.ndarray | None = None) -> np.ndarray:
+        """Column-wise mean of *data* rejecting outliers.
+
+        Values are rejected if their distance to the column median exceeds *m* times the median absolute deviation.
+
+        Args:
+            data: array of shape (number of paths, number of results)
+            m: outlier threshold in multiples of the median absolute deviation
+            median: column-wise median of *data* if already known (calculated if None)
+
+        Returns:
+            array of means without outliers for each column
+
+        """
+        if median is None:
+            median = np.nanmedian(data, axis=0)
+        d = np.abs(data - median)
+        mdev = np.nanmedian(d, axis=0)
+        s = np.where(mdev != 0, d / np.where(mdev == 0, 1, mdev), 0.0)
+        return np.nanmean(np.where(s < m, data, np.nan), axis=0)
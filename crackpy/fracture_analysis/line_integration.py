@@ -101,6 +101,11 @@ class IntegralProperties:
             self.buckner_williams_terms.remove(0)
             print('Buckner-Williams terms should not include 0. Removed from terms.')
         self.buckner_williams_terms.sort()
+
+    @property
+    def n1_index(self) -> int:
+        """Index of the Williams term n=1 in *buckner_williams_terms*, used for the Bueckner-Chen SIFs."""
+        return self.buckner_williams_terms.index(1)
     
     def set_automatically(self, data: InputData, auto_detect_threshold: float):
         """Automatically set up the integration path properties.
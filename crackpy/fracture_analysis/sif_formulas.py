@@ -0,0 +1,61 @@
+import math
+
+# constant factors of the SIF formulas (1 / sqrt(1000) converts from MPa*sqrt(mm) to MPa*sqrt(m))
+SQRT_2PI = math.sqrt(2 * math.pi)
+SQRT_PI_HALF = math.sqrt(math.pi / 2)
+INV_SQRT_1000 = 1.0 / math.sqrt(1000.0)
+K_SCALE = SQRT_2PI * INV_SQRT_1000
+
+
+def cjp_to_sifs(A_r: float, B_r: float, B_i: float, C: float, E: float) -> tuple[float, float, float, float, float]:
+    """Derive stress intensity factors and T-stress from the coefficients of the CJP model.
+
+    From Christopher et al. (2013) "Extension of the CJP model to mixed mode I and mode II" formulas 4-8.
+
+    Args:
+        A_r: CJP coefficient A_r
+        B_r: CJP coefficient B_r
+        B_i: CJP coefficient B_i
+        C: CJP coefficient C
+        E: CJP coefficient E
+
+    Returns:
+        tuple (K_F, K_R, K_S, K_II, T) of SIFs in MPa*m^{1/2} and T-stress in MPa
+
+    """
+    K_F = SQRT_PI_HALF * INV_SQRT_1000 * (A_r - 3 * B_r - 8 * E)
+    K_R = -4 * SQRT_PI_HALF * INV_SQRT_1000 * (2 * B_i + E * math.pi)
+    K_S = -SQRT_PI_HALF * INV_SQRT_1000 * (A_r + B_r)
+    K_II = 2 * K_SCALE * B_i
+    T = -C
+    return K_F, K_R, K_S, K_II, T
+
+
+def williams_to_sifs(a_1: float, b_1: float, a_2: float) -> tuple[float, float, float]:
+    """Derive stress intensity factors and T-stress from Williams coefficients [Kuna formula 3.45].
+
+    Args:
+        a_1: Williams coefficient a_1
+        b_1: Williams coefficient b_1
+        a_2: Williams coefficient a_2
+
+    Returns:
+        tuple (K_I, K_II, T) of SIFs in MPa*m^{1/2} and T-stress in MPa
+
+    """
+    K_I, K_II = chen_to_sifs(a_1, b_1)
+    return K_I, K_II, 4 * a_2
+
+
+def chen_to_sifs(a_1: float, b_1: float) -> tuple[float, float]:
+    """Derive stress intensity factors from the first Williams coefficients, e.g. of the Bueckner-Chen integral.
+
+    Args:
+        a_1: Williams coefficient a_1
+        b_1: Williams coefficient b_1
+
+    Returns:
+        tuple (K_I, K_II) of SIFs in MPa*m^{1/2}
+
+    """
+    return K_SCALE * a_1, -K_SCALE * b_1
@@ -0,0 +1,165 @@
+import contextlib
+import io
+import os
+import pickle
+import unittest
+import warnings
+from unittest import mock
+
+import numpy as np
+
+from crackpy.fracture_analysis import analysis as analysis_module
+from crackpy.fracture_analysis.analysis import FractureAnalysis
+from crackpy.fracture_analysis.data_processing import CrackTipInfo, InputData
+from crackpy.fracture_analysis.line_integration import IntegralProperties
+from crackpy.structure_elements.data_files import Nodemap
+from crackpy.structure_elements.material import Material
+
+
+class TestMeanWoOutliers(unittest.TestCase):
+    def test_mean_wo_outliers(self):
+        data = np.asarray([[1.0, 2.0, 5.0],
+                           [1.1, 2.0, 5.0],
+                           [0.9, 2.0, np.nan],
+                           [10.0, 2.0, 5.0]])
+        means = FractureAnalysis.mean_wo_outliers(data, m=2)
+
+        # outlier 10.0 is rejected, constant columns and NaNs are handled
+        self.assertIsInstance(means, np.ndarray)
+        np.testing.assert_allclose(means, [1.0, 2.0, 5.0])
+
+    def test_mean_wo_outliers_all_nan(self):
+        data = np.full((3, 2), np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            means = FractureAnalysis.mean_wo_outliers(data, m=2)
+        self.assertTrue(np.all(np.isnan(means)))
+
+
+class TestColumnStatistics(unittest.TestCase):
+    def test_column_statistics(self):
+        data = np.asarray([[1.0, 4.0],
+                           [2.0, np.nan],
+                           [3.0, 4.0],
+                           [30.0, 5.0]])
+        means, medians, means_wo_outliers = FractureAnalysis.column_statistics(data, m=2)
+
+        np.testing.assert_allclose(means, [9.0, 13 / 3])
+        np.testing.assert_allclose(medians, [2.5, 4.0])
+        np.testing.assert_allclose(means_wo_outliers, [2.0, 13 / 3])
+
+
+class TestFailedOptimization(unittest.TestCase):
+    def test_failed_optimization_results_are_nan(self):
+        analysis = FractureAnalysis.__new__(FractureAnalysis)
+        analysis.optimization = mock.Mock(terms=np.asarray([1, 2]))
+        analysis.optimization.optimize_cjp_displacements.side_effect = ValueError
+        analysis.optimization.optimize_williams_displacements.side_effect = ValueError
+        analysis._init_optimizaton_results()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis._run_cjp_optimization()
+            analysis._run_williams_optimization()
+
+        self.assertEqual(list(analysis.res_cjp), ['Error', 'K_F', 'K_R', 'K_S', 'K_II', 'T'])
+        self.assertTrue(np.all(np.isnan(list(analysis.res_cjp.values()))))
+        self.assertTrue(np.all(np.isnan(list(analysis.sifs_fit.values()))))
+        self.assertTrue(np.isnan(analysis.williams_fit_a_n[1]))
+
+        # failed results do not share state between analyses
+        analysis.res_cjp['K_F'] = 0.0
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis._run_cjp_optimization()
+        self.assertTrue(np.isnan(analysis.res_cjp['K_F']))
+
+
+class DummyNodemapMixin:
+    """Set up small fracture analyses of a dummy nodemap."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.material = Material(E=72000, nu_xy=0.33, sig_yield=350)
+        cls.crack_tip = CrackTipInfo(crack_tip_x=-15.5, crack_tip_y=0, crack_tip_angle=180, left_or_right='left')
+        cls.nodemap = Nodemap(name='Dummy2_WPXXX_DummyVersuch_2_dic_results_1_52.txt',
+                              folder=os.path.join(  # '..', '..', '..', '..',
+                                  'test_data', 'crack_detection', 'Nodemaps'))
+        cls.data = InputData(cls.nodemap)
+        cls.data.calc_stresses(cls.material)
+        cls.data.transform_data(cls.crack_tip.crack_tip_x, cls.crack_tip.crack_tip_y,
+                                cls.crack_tip.crack_tip_angle)
+
+    def _analysis(self, buckner_williams_terms=None, number_of_paths=4):
+        integral_properties = IntegralProperties(
+            number_of_paths=number_of_paths, integral_tick_size=0.5,
+            integral_size_left=-5, integral_size_right=10, integral_size_top=8, integral_size_bottom=-8,
+            top_offset=3, bottom_offset=-3,
+            paths_distance_left=0.5, paths_distance_right=0.5, paths_distance_top=0.5, paths_distance_bottom=0.5,
+            buckner_williams_terms=buckner_williams_terms or [-1, 1, 2, 3]
+        )
+        return FractureAnalysis(material=self.material, nodemap=self.nodemap, data=self.data,
+                                crack_tip_info=self.crack_tip, integral_properties=integral_properties,
+                                optimization_properties=None)
+
+
+class TestRunBatch(DummyNodemapMixin, unittest.TestCase):
+    def test_run_batch(self):
+        analyses = [FractureAnalysis.__new__(FractureAnalysis) for _ in range(2)]
+        for analysis in analyses:
+            analysis.run = mock.Mock()
+        self.assertEqual(FractureAnalysis.run_batch(analyses), analyses)
+        for analysis in analyses:
+            analysis.run.assert_called_once()
+
+    def test_run_batch_process_pool_equals_serial(self):
+        # analyses with different Buckner-Williams terms can be run in one batch
+        serial = [self._analysis(number_of_paths=2), self._analysis([1, 2], number_of_paths=2)]
+        FractureAnalysis.run_batch(serial, num_of_kernels=1)
+
+        parallel = [self._analysis(number_of_paths=2), self._analysis([1, 2], number_of_paths=2)]
+        # ensure that the process pool is used on machines with few CPUs
+        with mock.patch('multiprocessing.cpu_count', return_value=4), \
+                mock.patch.object(analysis_module, 'ProcessPoolExecutor',
+                                  wraps=analysis_module.ProcessPoolExecutor) as executor:
+            self.assertEqual(FractureAnalysis.run_batch(parallel, num_of_kernels=2), parallel)
+        executor.assert_called_once()
+
+        for parallel_analysis, serial_analysis in zip(parallel, serial):
+            np.testing.assert_array_equal(parallel_analysis.results, serial_analysis.results)
+            for statistic, sifs in serial_analysis.sifs_int.items():
+                for key, value in sifs.items():
+                    np.testing.assert_array_equal(parallel_analysis.sifs_int[statistic][key], value)
+            # only the results are copied back from the worker processes
+            self.assertIs(parallel_analysis.data, self.data)
+            self.assertIs(parallel_analysis.material, self.material)
+
+    def test_williams_int_survives_pickling(self):
+        analysis = FractureAnalysis.__new__(FractureAnalysis)
+        analysis.williams_int = np.full((2, 3, 3), np.nan)
+        copy = pickle.loads(pickle.dumps(analysis))
+        copy.williams_int[0] = [[1, 2, 3]] * 3
+        np.testing.assert_array_equal(copy.williams_int_a_n[0], [2, 2, 2])
+        np.testing.assert_array_equal(copy.williams_int_b_n[0], [3, 3, 3])
+
+
+class TestParallelLineIntegrals(DummyNodemapMixin, unittest.TestCase):
+    def test_process_pool_equals_serial(self):
+        serial = self._analysis()
+        serial._run_line_integrals(num_of_kernels=1)
+
+        parallel = self._analysis()
+        # ensure that the process pool is used on machines with few CPUs
+        with mock.patch('multiprocessing.cpu_count', return_value=4), \
+                mock.patch.object(analysis_module, 'ProcessPoolExecutor',
+                                  wraps=analysis_module.ProcessPoolExecutor) as executor:
+            parallel._run_line_integrals(num_of_kernels=2)
+        executor.assert_called_once()
+
+        np.testing.assert_array_equal(parallel.results, serial.results)
+        np.testing.assert_array_equal(parallel.williams_int, serial.williams_int)
+        self.assertEqual(parallel.int_sizes, serial.int_sizes)
+        for parallel_points, serial_points in zip(parallel.integration_points, serial.integration_points):
+            np.testing.assert_array_equal(parallel_points, serial_points)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import math
+import unittest
+
+from numpy.testing import assert_allclose
+
+from crackpy.fracture_analysis.sif_formulas import chen_to_sifs, cjp_to_sifs, williams_to_sifs
+
+
+class SIFFormulas(unittest.TestCase):
+
+    def test_cjp_to_sifs(self):
+        K_F, K_R, K_S, K_II, T = cjp_to_sifs(A_r=10, B_r=1, B_i=0.5, C=2, E=0.25)
+        # Christopher et al. (2013) formulas 4-8, converted from MPa*mm^{1/2} to MPa*m^{1/2}
+        factor = math.sqrt(math.pi / 2) / math.sqrt(1000)
+        assert_allclose([K_F, K_R, K_S, K_II, T],
+                        [(10 - 3 * 1 - 8 * 0.25) * factor,
+                         -4 * (2 * 0.5 + 0.25 * math.pi) * factor,
+                         -(10 + 1) * factor,
+                         2 * math.sqrt(2 * math.pi) * 0.5 / math.sqrt(1000),
+                         -2])
+
+    def test_williams_to_sifs(self):
+        K_I, K_II, T = williams_to_sifs(a_1=1, b_1=1, a_2=0.5)
+        factor = math.sqrt(2 * math.pi) / math.sqrt(1000)
+        assert_allclose([K_I, K_II, T], [factor, -factor, 2])
+
+    def test_chen_to_sifs(self):
+        K_I, K_II = chen_to_sifs(a_1=2, b_1=-3)
+        factor = math.sqrt(2 * math.pi) / math.sqrt(1000)
+        assert_allclose([K_I, K_II], [2 * factor, 3 * factor])
+
+
+if __name__ == '__main__':
+    unittest.main()